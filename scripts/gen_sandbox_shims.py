@@ -1,7 +1,5 @@
 
-import os, sys
-
-members = []
+import itertools, os, sys
 
 # generate SetPointer proxies
 buffer_types = [
@@ -21,11 +19,16 @@ array_types = [
     ("ARRAY_TYPE_VERTEX", "Vertex"),
 ]
 
-for (buffer_class, buffer_type) in buffer_types:
-    for (array_type, method_name) in array_types:
-        members.append(f"public static void gl{method_name}Pointer(int size, int stride, {buffer_class} pointer) {{")
-        members.append(f"    RenderSandbox.addPointerArray(size, stride, RenderSandbox.{array_type}, RenderSandbox.{buffer_type}, MemoryUtil.getAddress(pointer), pointer.remaining());")
-        members.append(f"}}")
+POINTER_TPL = (
+    "    public static void gl%sPointer(int size, int stride, %s pointer) {\n"
+    "        RenderSandbox.addPointerArray(size, stride, RenderSandbox.%s, RenderSandbox.%s, MemoryUtil.getAddress(pointer), pointer.remaining());\n"
+    "    }"
+)
+
+members = [
+    POINTER_TPL % (method_name, buffer_class, array_type, buffer_type)
+    for ((buffer_class, buffer_type), (array_type, method_name)) in itertools.product(buffer_types, array_types)
+]
 
 out_path = os.path.join(
     os.path.dirname(__file__), "..",
@@ -34,20 +37,31 @@ out_path = os.path.join(
     "rendering", "RenderSandboxGen.java"
 )
 
-with open(out_path, "w") as out:
-    lines = [
-        "package com.recursive_pineapple.mcvk.rendering;"
-        "",
-        "",
-        "import org.lwjgl.MemoryUtil;",
-        "import java.nio.ByteBuffer;",
-        "import java.nio.DoubleBuffer;",
-        "import java.nio.FloatBuffer;",
-        "import java.nio.IntBuffer;",
-        "import java.nio.ShortBuffer;",
-        "",
-        "public class RenderSandboxGen {",
-        *[f"    {member}" for member in members],
-        "}"
-    ]
-    out.writelines([line + "\n" for line in lines])
+lines = [
+    "package com.recursive_pineapple.mcvk.rendering;"
+    "",
+    "",
+    "import org.lwjgl.MemoryUtil;",
+    "import java.nio.ByteBuffer;",
+    "import java.nio.DoubleBuffer;",
+    "import java.nio.FloatBuffer;",
+    "import java.nio.IntBuffer;",
+    "import java.nio.ShortBuffer;",
+    "",
+    "public class RenderSandboxGen {",
+    *members,
+    "}"
+]
+
+new_text = "\n".join(lines) + "\n"
+
+try:
+    with open(out_path) as f:
+        old_text = f.read()
+except FileNotFoundError:
+    old_text = None
+
+# leave the file (and its mtime) alone when nothing changed, so gradle doesn't recompile it
+if new_text != old_text:
+    with open(out_path, "w") as out:
+        out.write(new_text)
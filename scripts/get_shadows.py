@@ -1,34 +1,27 @@
 #!/usr/bin/python3
 
+import functools
+import hashlib
 import re
 import os
 import sys
+import tempfile
 
 class_filter = os.getenv("CLASS_FILTER")
+class_filter = os.fsencode(class_filter) if class_filter is not None else None
 operation = os.getenv("OPERATION", "shadows")
-method_blacklist = os.getenv("METHOD_BLACKLIST", "").split(",")
-field_blacklist = os.getenv("FIELD_BLACKLIST", "").split(",")
-
-MODIFIERS = ["public", "private", "static", "final", "volatile", "transient", "synchronized"]
-
-PUNCT = [
-    "(",
-    ")",
-    ",",
-    "=",
-    ";",
-    "[",
-    "]",
-    "{",
-    "}",
-    "<",
-    ">",
-    "."
-]
-
-PUNCT2 = [
-    ("=", "=")
-]
+method_blacklist = os.fsencode(os.getenv("METHOD_BLACKLIST", "")).split(b",")
+field_blacklist = os.fsencode(os.getenv("FIELD_BLACKLIST", "")).split(b",")
+
+CACHE_ENV = ["CLASS_FILTER", "OPERATION", "METHOD_BLACKLIST", "FIELD_BLACKLIST"]
+CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache")),
+    "mcvk-shadows"
+)
+# entries are never evicted, so the directory keeps growing until it is cleared by hand
+USE_CACHE = not os.getenv("MCVK_SHADOWS_NO_CACHE")
+
+MODIFIERS = [b"public", b"private", b"static", b"final", b"volatile", b"transient", b"synchronized"]
 
 SYMBOL = 1
 NUMBER = 2
@@ -38,228 +31,238 @@ NEWLINE = 5
 COMMENT = 6
 MLCOMMENT = 7
 
-def is_alpha(c):
-    return c >= 'A' and c <= 'Z' or c >= 'a' and c <= 'z'
-
-def is_numeric(c):
-    return c >= '0' and c <= '9'
-
-def get_token_category(curr, next, prev):
-    if curr == '*' and next == '/' and prev == MLCOMMENT:
-        return MLCOMMENT, 2
-
-    if curr in [' ', '\t']:
-        return WS, 1
-
-    if curr == '\n':
-        return NEWLINE, 1
-
-    if curr == '\r' and next == '\n':
-        return NEWLINE, 2
-        
-    if curr == '/' and next == '/':
-        return COMMENT, 2
-
-    if is_numeric(curr):
-        if prev == SYMBOL:
-            return SYMBOL, 1
-        else:
-            return NUMBER, 1
-
-    for c1, c2 in PUNCT2:
-        if curr == c1 and next == c2:
-            return PUNC, 2
-
-    if curr in PUNCT:
-        return PUNC, 1
-
-    return SYMBOL, 1
-
-data = sys.stdin.read()
-
-tokens = []
-current_token = get_token_category(data[0], data[1], None)
-current_token_start = 0
-
-i = 0
-while i < len(data):
-    cat, to_consume = get_token_category(
-        data[i],
-        data[i + 1] if i + 1 < len(data) else None,
-        current_token
-    )
-
-    if cat != current_token or cat == PUNC or cat == NEWLINE:
-        tokens.append((current_token, data[current_token_start:i]))
-        current_token = cat
-        current_token_start = i
-    
-    i += to_consume
-
-if current_token != None:
-    tokens.append((current_token, data[current_token_start:i]))
-
-lines = []
-
-line_start = 0
-
-i = 0
-while i < len(tokens):
-    if tokens[i][0] == NEWLINE:
-        i += 1
-        lines.append(tokens[line_start:i])
-        line_start = i
-    else:
-        i += 1
-
-if line_start < i:
-    lines.append(tokens[line_start:i])
-
-last_class = None
-class_indent = None
-after_ctor = False
-items = []
+TOKEN_RE = re.compile(rb"""
+    (?P<WS>[ \t]+)
+  | (?P<NEWLINE>\r?\n)
+  | (?P<STRING>"(?:\\.|[^"\\\r\n])*"|'(?:\\.|[^'\\\r\n])*')
+  | (?P<COMMENT>//[^\r\n]*)
+  | (?P<MLCOMMENT>/\*.*?\*/)
+  | (?P<PUNC>==|[(),=;\[\]{}<>.])
+  | (?P<NUMBER>\d+)
+  | (?P<SYMBOL>[^\s(),=;\[\]{}<>.\d][^\s(),=;\[\]{}<>.]*)
+""", re.VERBOSE | re.DOTALL)
+
+CATS = {
+    "WS": WS,
+    "NEWLINE": NEWLINE,
+    "STRING": SYMBOL,
+    "COMMENT": COMMENT,
+    "MLCOMMENT": MLCOMMENT,
+    "PUNC": PUNC,
+    "NUMBER": NUMBER,
+    "SYMBOL": SYMBOL,
+}
+
+data = sys.stdin.buffer.read()
+
+# the output only depends on stdin, the env vars above and this script, so identical runs can be replayed from disk
+if USE_CACHE:
+    with open(__file__, "rb") as f:
+        script = f.read()
+
+    cache_key = hashlib.blake2b()
+
+    # repr() keeps unset and empty variables apart, and length prefixes keep the fields from running into each other
+    for field in [data, script, *[repr(os.getenv(name)).encode() for name in CACHE_ENV]]:
+        cache_key.update(b"%d:" % len(field))
+        cache_key.update(field)
+
+    cache_path = os.path.join(CACHE_DIR, cache_key.hexdigest())
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached = f.read()
+    except OSError:
+        cached = None
+
+    if cached is not None:
+        sys.stdout.buffer.write(cached)
+        sys.exit(0)
 
 def find_generics(rest: list, start):
     i = start + 1
     count = 1
     while i < len(rest) and count > 0:
-        if rest[i][1] == "<":
+        if rest[i][1] == b"<":
             count += 1
-        elif rest[i][1] == ">":
+        elif rest[i][1] == b">":
             count -= 1
         i += 1
 
     if count == 0:
-        return start, i, rest[start:i]
+        return start, i, tuple(rest[start:i])
     else:
         return None, None, None
 
-for line in lines:
-    indent = ""
-
-    for token in line:
-        if token[0] == WS:
-            indent += token[1]
-        else:
-            break
-
-    line = [token for token in line if token[0] != WS]
-
-    mod_idx = 0
-
-    while mod_idx < len(line) and line[mod_idx][1] in MODIFIERS:
-        mod_idx += 1
-
-    mods = line[:mod_idx]
-    rest = line[mod_idx:]
-
-    type_generics = []
-    name_generics = []
-
-    if len(rest) > 2 and rest[1][1] == "<":
-        start, end, g = find_generics(rest, 1)
-        if end:
-            del rest[start:end]
-            type_generics = g
-    elif len(rest) > 3 and rest[2][1] == "<":
-        start, end, g = find_generics(rest, 2)
-        if end:
-            del rest[start:end]
-            name_generics = g
-
-    if len(rest) > 2 and rest[0][1] == "class" and rest[1][0] == SYMBOL:
-        last_class = rest[1][1]
-        after_ctor = False
-        class_indent = len(indent)
-        items.append(("class", None, (type_generics, name_generics), [mod[1] for mod in mods], rest[1][1], rest))
-
-    if len(rest) > 1 and last_class != None and rest[0][1] == last_class and rest[1][1] == "(":
-        items.append(("ctor", None, (type_generics, name_generics), [mod[1] for mod in mods], rest[0][1], rest))
-        after_ctor = True
-
-    if len(rest) >= 3 and rest[0][0] == SYMBOL and rest[1][0] == SYMBOL and rest[2][1] in ["=", ";"]:
-        if not after_ctor and len(indent) == class_indent + 4:
-            items.append(("field", last_class, (type_generics, name_generics), [mod[1] for mod in mods], rest[1][1], rest))
-
-    if len(rest) >= 3 and rest[0][0] == SYMBOL and rest[1][0] == SYMBOL and rest[2][1] == "(":
-        if len(indent) == class_indent + 4:
-            items.append(("method", last_class, (type_generics, name_generics), [mod[1] for mod in mods], rest[1][1], rest))
-
-if class_filter == "AUTO":
-    for (itype, parent, generics, mods, name, rest) in items:
-        if itype == "class":
-            class_filter = name
-            break
-
-def generics_to_string(generics):
-    generics = ", ".join([g[1] for g in generics if g[0] == SYMBOL])
-
-    return (("<" + generics + ">") if len(generics) > 0 else "")
-
-if operation == "list-fields":
-    for (itype, parent, generics, mods, name, rest) in items:
-        if itype == "field" and (class_filter is None or class_filter == parent):
-            print(name)
-if operation == "list-methods":
-    for (itype, parent, generics, mods, name, rest) in items:
-        if itype == "method" and (class_filter is None or class_filter == parent):
-            print(name)
-elif operation == "shadows":
-    for (itype, parent, (type_generics, name_generics), mods, name, rest) in items:
-        if class_filter is None or class_filter == parent:
-            if itype == "field" and name not in field_blacklist:
-                print("    @org.spongepowered.asm.mixin.Shadow")
-
-                if "final" in mods:
-                    print("    @org.spongepowered.asm.mixin.Final")
-
-                field = [
-                    *[mod for mod in mods if mod != "final"],
-                    rest[0][1] + generics_to_string(type_generics),
-                    name + generics_to_string(name_generics),
-                ]
-
-                print("    " + " ".join(field) + ";")
-                print()
-            elif itype == "method" and name not in method_blacklist:
-                print("    @org.spongepowered.asm.mixin.Shadow")
-
-                ret = rest[0][1]
-
-                body = " return null; "
-
-                if ret == "void":
-                    body = " "
-                elif ret == "boolean":
-                    body = " return false; "
-                elif ret in ["byte", "short", "int", "long"]:
-                    body = " return 0; "
-                elif ret == "float":
-                    body = " return 0f; "
-                elif ret == "double":
-                    body = " return 0d; "
-
-                method = [
-                    *[mod for mod in mods if mod != "final"],
-                    ret + generics_to_string(type_generics),
-                    name + generics_to_string(name_generics),
-                ]
-
-                args_start = None
-                args_end = None
-
-                for i, token in enumerate(rest):
-                    if token[1] == "(":
-                        args_start = i
-                    elif token[1] == ")":
-                        args_end = i
-
-                args = [token for token in rest[args_start+1:args_end] if token[1] != ","]
-
-                types = [token[1] for token in args[::2]]
-                names = [token[1] for token in args[1::2]]
-                args = [f"{type} {name}" for (type, name) in zip(types, names)]
-
-                print("    " + " ".join(method) + "(" + ", ".join(args) + ") {" + body + "}")
-                print()
+@functools.lru_cache(maxsize=None)
+def generics_to_string(generics: tuple):
+    generics = b", ".join([g[1] for g in generics if g[0] == SYMBOL])
+
+    return ((b"<" + generics + b">") if len(generics) > 0 else b"")
+
+def make_item(itype, parent, name, mods, rest, type_generics, name_generics):
+    mods = [mod[1] for mod in mods]
+    mods_nofinal = [mod for mod in mods if mod != b"final"]
+    generics = (generics_to_string(type_generics), generics_to_string(name_generics))
+
+    return (itype, parent, generics, mods, mods_nofinal, name, rest)
+
+def lines_iter(token_iter):
+    line = []
+
+    for m in token_iter:
+        cat = CATS[m.lastgroup]
+        # only the width of whitespace is ever used, so don't bother slicing it out
+        line.append((cat, m.end() - m.start() if cat == WS else m.group()))
+
+        if cat == NEWLINE:
+            yield line
+            line = []
+
+    if line:
+        yield line
+
+def items_iter(line_iter):
+    last_class = None
+    class_indent = None
+    after_ctor = False
+
+    for line in line_iter:
+        # a whitespace run is always a single token, so the indent is at most the first one
+        indent_len = line[0][1] if line[0][0] == WS else 0
+
+        line = [token for token in line if token[0] != WS]
+
+        mod_idx = 0
+
+        while mod_idx < len(line) and line[mod_idx][1] in MODIFIERS:
+            mod_idx += 1
+
+        mods = line[:mod_idx]
+        rest = line[mod_idx:]
+
+        type_generics = ()
+        name_generics = ()
+
+        if len(rest) > 2 and rest[1][1] == b"<":
+            start, end, g = find_generics(rest, 1)
+            if end:
+                del rest[start:end]
+                type_generics = g
+        elif len(rest) > 3 and rest[2][1] == b"<":
+            start, end, g = find_generics(rest, 2)
+            if end:
+                del rest[start:end]
+                name_generics = g
+
+        if len(rest) > 2 and rest[0][1] == b"class" and rest[1][0] == SYMBOL:
+            last_class = rest[1][1]
+            after_ctor = False
+            class_indent = indent_len
+            yield make_item("class", None, rest[1][1], mods, rest, type_generics, name_generics)
+
+        if len(rest) > 1 and last_class != None and rest[0][1] == last_class and rest[1][1] == b"(":
+            yield make_item("ctor", None, rest[0][1], mods, rest, type_generics, name_generics)
+            after_ctor = True
+
+        if len(rest) >= 3 and rest[0][0] == SYMBOL and rest[1][0] == SYMBOL and rest[2][1] in [b"=", b";"]:
+            if not after_ctor and class_indent is not None and indent_len == class_indent + 4:
+                yield make_item("field", last_class, rest[1][1], mods, rest, type_generics, name_generics)
+
+        if len(rest) >= 3 and rest[0][0] == SYMBOL and rest[1][0] == SYMBOL and rest[2][1] == b"(":
+            if class_indent is not None and indent_len == class_indent + 4:
+                yield make_item("method", last_class, rest[1][1], mods, rest, type_generics, name_generics)
+
+out_lines = []
+
+for (itype, parent, (type_generics, name_generics), mods, mods_nofinal, name, rest) in items_iter(lines_iter(TOKEN_RE.finditer(data))):
+    if class_filter == b"AUTO" and itype == "class":
+        class_filter = name
+
+    if class_filter is not None and class_filter != parent:
+        continue
+
+    if operation == "list-fields":
+        if itype == "field":
+            out_lines.append(name)
+    elif operation == "list-methods":
+        if itype == "method":
+            out_lines.append(name)
+    elif operation == "shadows":
+        if itype == "field" and name not in field_blacklist:
+            out_lines.append(b"    @org.spongepowered.asm.mixin.Shadow")
+
+            if b"final" in mods:
+                out_lines.append(b"    @org.spongepowered.asm.mixin.Final")
+
+            field = [
+                *mods_nofinal,
+                rest[0][1] + type_generics,
+                name + name_generics,
+            ]
+
+            out_lines.append(b"    " + b" ".join(field) + b";")
+            out_lines.append(b"")
+        elif itype == "method" and name not in method_blacklist:
+            out_lines.append(b"    @org.spongepowered.asm.mixin.Shadow")
+
+            ret = rest[0][1]
+
+            body = b" return null; "
+
+            if ret == b"void":
+                body = b" "
+            elif ret == b"boolean":
+                body = b" return false; "
+            elif ret in [b"byte", b"short", b"int", b"long"]:
+                body = b" return 0; "
+            elif ret == b"float":
+                body = b" return 0f; "
+            elif ret == b"double":
+                body = b" return 0d; "
+
+            method = [
+                *mods_nofinal,
+                ret + type_generics,
+                name + name_generics,
+            ]
+
+            args_start = None
+            args_end = None
+
+            for i, token in enumerate(rest):
+                if token[1] == b"(":
+                    args_start = i
+                elif token[1] == b")":
+                    args_end = i
+
+            args = [token for token in rest[args_start+1:args_end] if token[1] != b","]
+
+            types = [token[1] for token in args[::2]]
+            names = [token[1] for token in args[1::2]]
+            args = [b"%s %s" % (type, name) for (type, name) in zip(types, names)]
+
+            out_lines.append(b"    " + b" ".join(method) + b"(" + b", ".join(args) + b") {" + body + b"}")
+            out_lines.append(b"")
+
+output = (b"\n".join(out_lines) + b"\n") if out_lines else b""
+
+sys.stdout.buffer.write(output)
+
+if USE_CACHE:
+    tmp_path = None
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(output)
+
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass